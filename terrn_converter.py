@@ -1,219 +1,388 @@
 import os
+import re
+import errno
+import locale
+import logging
+import mmap
 import sys
-import uuid
+import shutil
 import argparse
 import subprocess  # For calling GIMP in batch mode
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+try:
+    from PIL import Image  # Optional, converts DDS to PNG without starting GIMP
+except ImportError:
+    Image = None
+
+log = logging.getLogger(__name__)
 
 # ANSI color codes
 YELLOW = '\033[93m'
 ENDC = '\033[0m'
 
-def extract_texture_name(texture_line):
-    """Extract texture filename from a texture_unit line"""
-    # Skip comment lines
-    if texture_line.strip().startswith('//'):
-        return None
-    # Find texture keyword and extract name
-    if 'texture' in texture_line:
-        tex = texture_line.split('texture')[1].strip()
-        # Remove any trailing comments
-        tex = tex.split('//')[0].strip()
-        # Clean up any remaining braces and whitespace
-        return tex.replace('}', '').replace('{', '').strip()
-    return None
+# Blendmap channels, and the alpha mask used when an AlphaSplatTerrain material doesn't set one
+RGBA_CHANNELS = ('R', 'G', 'B', 'A')
+DEFAULT_ALPHA_MASK = (1, 1, 1, 0)
+
+# GIMP Script-Fu procedures, defined at the start of each batch script and then called for each
+# texture. The DDS one adds a black alpha mask and saves with DXT5 compression and mipmaps; the
+# file-dds-save arguments after the file names are format (auto), mipmaps, save-type, compression,
+# format-version (5 = DXT5), transparent-index, coverage, use-perceptual-metric, alpha-test-threshold,
+# color-metric-given, color-metric, alpha-dither and dither
+GIMP_PROCEDURES = (
+    '(define (terrn-save-dds input output)'
+    ' (let* ((image (car (gimp-file-load RUN-NONINTERACTIVE input input)))'
+    ' (drawable (car (gimp-image-get-active-layer image))))'
+    ' (gimp-layer-add-alpha drawable)'
+    ' (gimp-edit-fill drawable TRANSPARENT-FILL)'
+    ' (file-dds-save RUN-NONINTERACTIVE image drawable output output 0 1 0 0 5 0 0 0 0 0 0 0 0)'
+    ' (gimp-image-delete image)))',
+    '(define (terrn-save-png input output)'
+    ' (let* ((image (car (gimp-file-load RUN-NONINTERACTIVE input input)))'
+    ' (drawable (car (gimp-image-get-active-layer image))))'
+    ' (file-png-save-defaults RUN-NONINTERACTIVE image drawable output output)'
+    ' (gimp-image-delete image)))',
+)
+# Script-Fu procedure, start message and done message for each texture job format
+GIMP_JOBS = {
+    'dds': ('terrn-save-dds', "Converting texture to DDS with alpha mask: %s", "Converted texture: %s"),
+    'png': ('terrn-save-png', "Converting texture to PNG for use in page file: %s", "Converted texture to PNG: %s"),
+}
+
+# os.link errors meaning the output folder can't hold a hard link to the default textures, so they are copied
+LINK_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+# Buffer size for reading terrain files (128 KiB)
+IO_BUFFER_SIZE = 131072
+
+# Files smaller than this are read instead of memory-mapped (16 KiB)
+MMAP_MIN_SIZE = 16384
+
+# Encoding of terrain files and generated files (same default as open() in text mode)
+ENCODING = locale.getpreferredencoding(False)
+
+# Metadata comments left out of the .tobj: //fileinfo and ;fileinfo tags, //author and ;author tags
+# in any case, and numbered entries starting the line such as "//12=..." (a digit before the first '=')
+METADATA_COMMENT_RE = re.compile(rb'(?://|;)(?:fileinfo|(?i:author))|^(?://|;)[^=]*\d[^=]*=')
+# Author comments: "//author <type> <id> <name>", type and name are optional
+AUTHOR_RE = re.compile(rb'(?://|;)author[^ ]*(?: (?P<type>[^ ]*) [^ ]*(?: (?P<name>.*))?)?', re.I)
+
+# key=value lines of a terrain .cfg, lines starting with '#' are comments
+CFG_SETTING_RE = re.compile(rb'^[^\S\n]*([^#=\s][^=\n]*)=([^\n]*)', re.M)
+
+# Tokens of an ETTerrain material: comments, passes, texture units and their texture names
+MATERIAL_TOKEN_RE = re.compile(
+    r'(?P<comment>//[^\n]*)'
+    r'|\bpass\b[ \t]*(?P<pass>\w*)'
+    r'|(?P<unit>\btexture_unit\b)'
+    r'|\btexture[ \t]+(?P<texture>[^\s{}]+)'
+)
+# Identifiers that mark a material as an ETTerrain material
+ET_MATERIAL_RE = re.compile(r'et/program|etterrain|etambient', re.I)
+# set_texture_alias lines of a material inheriting from ETTerrainMaterial
+TEXTURE_ALIAS_RE = re.compile(r'^[ \t]*set_texture_alias[ \t]+(\S+)[ \t]+(\S+)', re.M)
+# Blend map and splat aliases, and alpha channel masks of an AlphaSplatTerrain material
+ALPHASPLAT_TOKEN_RE = re.compile(
+    r'^[ \t]*set_texture_alias[ \t]+(AlphaMap\w*|Splat\d+)[ \t]+(\S+)'
+    r'|alpha([01])Mask[ \t]+float4[ \t]+([^\n]*)', re.M)
+
+# Layout of the generated main .otc file
+OTC_TEMPLATE = (
+    'Heightmap.0.0.raw.size=%(heightmap_size)s\n'
+    'Heightmap.0.0.raw.bpp=%(heightmap_bpp)s\n'
+    'Heightmap.0.0.flipX=%(flip_x)d\n'
+    '\n'
+    'WorldSizeX=%(world_size_x)s\n'
+    'WorldSizeZ=%(world_size_z)s\n'
+    'WorldSizeY=%(world_size_y)s\n'
+    '\n'
+    'disableCaching=1\n'
+    '\n'
+    'PageFileFormat=%(terrain_name)s-page-0-0.otc\n'
+    '\n'
+    'MaxPixelError=%(max_pixel_error)s\n'
+    'LightmapEnabled=0\n'
+    'SpecularMappingEnabled=1\n'
+    'NormalMappingEnabled=1\n'
+)
+
+# Layout of the generated .terrn2 file; optional sections are filled in as whole lines
+TERRN2_TEMPLATE = (
+    '[General]\n'
+    'Name = %(name)s\n'
+    'GeometryConfig = %(geometry_config)s\n'
+    '%(water)s'
+    'AmbientColor = %(ambient_color)s\n'
+    'StartPosition = %(start_position)s\n'
+    '%(caelum)s'
+    'SandStormCubeMap = %(sandstorm_cubemap)s\n'
+    'Gravity = %(gravity)s\n'
+    'CategoryID = 129\n'
+    'Version = 1\n'
+    'GUID = %(guid)s\n'
+    '%(traction_map)s'
+    '\n\n'
+    '[Authors]\n'
+    '%(authors)s'
+    'terrn2 = CM_terrn_converter\n\n'
+    ' \n[Objects]\n'
+    '%(tobj_name)s=\n\n'
+    '[Scripts]\n'
+    '%(scripts)s'
+)
+
+def is_metadata_comment(line):
+    """Check if a stripped .terrn line (bytes) is a fileinfo/author tag or a numbered comment entry"""
+    # Plain object lines have no comment marker, so skip the regex work for them
+    if b'//' not in line and b';' not in line:
+        return False
+    return METADATA_COMMENT_RE.search(line) is not None
+
+def generate_guid():
+    """Generate a random version 4 GUID string for the terrn2 file"""
+    guid = bytearray(os.urandom(16))
+    guid[6] = (guid[6] & 0x0f) | 0x40  # Version 4
+    guid[8] = (guid[8] & 0x3f) | 0x80  # RFC 4122 variant
+    h = guid.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+def decode_text(data):
+    """Decode a value read from a terrain file, undecodable bytes are kept for writing back"""
+    return data.decode(ENCODING, 'surrogateescape')
+
+# .cfg keys read by convert_cfg_to_otc, with the setting each one fills and how its value is converted
+CFG_HANDLERS = {
+    b'Heightmap.image': ('heightmap_image', decode_text),
+    b'WorldTexture': ('world_texture', decode_text),
+    b'Heightmap.raw.size': ('heightmap_size', decode_text),
+    b'Heightmap.raw.bpp': ('heightmap_bpp', decode_text),
+    b'Heightmap.flip': ('heightmap_flip', lambda value: value.lower() == b'true'),
+    b'PageWorldX': ('world_size_x', decode_text),
+    b'PageWorldZ': ('world_size_z', decode_text),
+    b'MaxHeight': ('max_height', decode_text),
+    b'MaxPixelError': ('max_pixel_error', decode_text),
+    b'CustomMaterialName': ('custom_material', decode_text)
+}
+
+def write_file(path, data):
+    """Write text or bytes to a file with a single write on a raw file descriptor"""
+    if isinstance(data, str):
+        data = data.replace('\n', os.linesep).encode(ENCODING, 'surrogateescape')
+    data = memoryview(data)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        # os.write may write less than requested, so keep going until everything is out
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+@contextmanager
+def open_buffer(path):
+    """Open a file as a read-only bytes buffer, small files are read and larger ones memory-mapped"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+            # Mapping setup costs more than a plain read for small files (and empty files cannot be mapped)
+            yield f.read()
+            return
+        if hasattr(mmap, 'MAP_POPULATE'):
+            # Prefault all pages in one go on Linux instead of taking a fault per page
+            mapped = mmap.mmap(f.fileno(), 0, flags=mmap.MAP_PRIVATE | mmap.MAP_POPULATE, prot=mmap.PROT_READ)
+        else:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+            # The buffer is scanned front to back, so ask for aggressive readahead (not available on Windows)
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        with mapped:
+            yield mapped
+
+def file_exists(path, listings=None):
+    """Check if a file exists, using listings ({directory: names}, normcased) when its directory was listed"""
+    names = listings.get(os.path.normcase(os.path.dirname(path))) if listings else None
+    if names is None:
+        return os.path.exists(path)
+    return os.path.normcase(os.path.basename(path)) in names
+
+def read_material_section(content, start):
+    """Decode the material definition starting at start, up to the next material"""
+    end = content.find(b"\nmaterial ", start)
+    return decode_text(content[start:end if end != -1 else len(content)])
+
+@lru_cache(maxsize=32)
+def find_material_sections(material_file, mtime_ns, material_name):
+    """Return the named material section and its base section, cached per file version"""
+    # Only the requested material (and its base) is decoded from the file buffer
+    with open_buffer(material_file) as content:
+        # Find the material section with case-insensitive search
+        # The name must end at whitespace, ':' or '{' so 'Terrain' doesn't match 'Terrain2'
+        search_pattern = re.compile(rb'material\s+' + re.escape(material_name.encode(ENCODING, 'surrogateescape')) +
+                                    rb'(?![^\s:{])', re.I)
+        match = search_pattern.search(content)
+        if not match:
+            return None
+            
+        # Get the actual material section using the found position
+        material_section = read_material_section(content, match.start())
+        
+        # Get base material section if this material inherits from ETTerrainMaterial
+        base_mat_section = None
+        if ": ETTerrainMaterial" in material_section:
+            base_mat_start = content.find(b"material ETTerrainMaterial")
+            if base_mat_start != -1:
+                base_mat_section = read_material_section(content, base_mat_start)
+                
+    return material_section, base_mat_section
 
 def parse_etterrain_material(material_file, material_name):
     """Parse an ETTerrain material definition and return texture info"""
     try:
-        print(f"\nSearching for material '{material_name}' in {os.path.basename(material_file)}")
-        with open(material_file, 'r') as f:
-            content = f.read()
-            
-        # Find the material section with case-insensitive search
-        content_lower = content.lower()
-        search_pattern = f"material {material_name}".lower()
-        material_start = content_lower.find(search_pattern)
-        if material_start == -1:
-            print("Material not found in file")
+        log.debug("\nSearching for material '%s' in %s", material_name, os.path.basename(material_file))
+        # The modification time is part of the cache key, so an edited file is read again
+        sections = find_material_sections(material_file, os.stat(material_file).st_mtime_ns, material_name)
+        if sections is None:
+            log.debug("Material not found in file")
             return None
+        material_section, base_mat_section = sections
             
-        print("Found material, checking type...")
-            
-        # Get the actual material section using the found position
-        material_section = content[material_start:]
-        material_end = material_section.find("\nmaterial ")
-        if material_end != -1:
-            material_section = material_section[:material_end]
+        log.debug("Found material, checking type...")
 
         # Check for material inheritance
         if ": AlphaSplatTerrain" in material_section:
-            print("Found AlphaSplatTerrain material, extracting textures...")
+            log.debug("Found AlphaSplatTerrain material, extracting textures...")
             return parse_alphasplat_material(material_section)
             
         # Check if this material inherits from ETTerrainMaterial
         inherited = False
         if ": ETTerrainMaterial" in material_section:
-            print("Found ETTerrainMaterial child material, extracting texture aliases...")
+            log.debug("Found ETTerrainMaterial child material, extracting texture aliases...")
             inherited = True
-            # Get base material section
-            base_mat_start = content.find("material ETTerrainMaterial")
-            if base_mat_start != -1:
-                base_mat_section = content[base_mat_start:]
-                base_mat_end = base_mat_section.find("\nmaterial ")
-                if base_mat_end != -1:
-                    base_mat_section = base_mat_section[:base_mat_end]
+            if base_mat_section is not None:
                 # Combine base and child sections for parsing
                 material_section = base_mat_section + "\n" + material_section
         
         # Check for ETTerrain identifiers
-        et_identifiers = [
-            "et/program",
-            "etterrain",
-            "etambient"
-        ]
-        
-        material_text = material_section.lower()
-        is_et_material = inherited or any(id in material_text for id in et_identifiers)
+        is_et_material = inherited or bool(ET_MATERIAL_RE.search(material_section))
                 
         if not is_et_material:
-            print("Not a supported terrain material type")
+            log.debug("Not a supported terrain material type")
             return None
 
-        print("Found ETTerrain material, extracting textures...")
+        log.debug("Found ETTerrain material, extracting textures...")
+        # Texture layers are stored as parallel diffuse and normal map lists
         textures = {
             'blendmaps': [],
-            'layers': []
+            'diffuse': [],
+            'normal': []
         }
 
         if inherited:
             # Process inherited material using texture aliases
-            aliases = {}
-            for line in material_section.split('\n'):
-                if 'set_texture_alias' in line:
-                    parts = line.split()
-                    if len(parts) >= 3:
-                        alias_name = parts[1].strip()
-                        texture_name = parts[2].strip()
-                        aliases[alias_name] = texture_name
+            aliases = dict(TEXTURE_ALIAS_RE.findall(material_section))
                         
             # Get RGB blend maps
             for i in range(1, 4):
                 rgbmap = aliases.get(f'RGBMap{i}')
                 if rgbmap:
-                    print(f"  Found blendmap: {rgbmap}")
+                    log.debug("  Found blendmap: %s", rgbmap)
                     textures['blendmaps'].append(rgbmap)
             
             # Get texture layers
-            print("\nProcessing texture layers:")
+            log.debug("\nProcessing texture layers:")
             for i in range(1, 4):  # For each RGB map
                 for color in ['R', 'G', 'B']:  # For each color channel
                     diffuse = aliases.get(f'{color}Map{i}_DIF')
                     normal = aliases.get(f'{color}Map{i}_NRM')
                     if diffuse and normal:
-                        print(f"  Layer {len(textures['layers'])+1}: {diffuse} + {normal}")
-                        textures['layers'].append((diffuse, normal))
+                        log.debug("  Layer %s: %s + %s", len(textures['diffuse']) + 1, diffuse, normal)
+                        textures['diffuse'].append(diffuse)
+                        textures['normal'].append(normal)
         else:
             # Original ETTerrain material processing
-            # Find Lighting and Splatting passes
-            print("\nExtracting texture information:")
-            lighting_pass = material_section[material_section.find("pass Lighting"):material_section.find("pass Splatting")]
-            splatting_pass = material_section[material_section.find("pass Splatting"):material_section.find("pass", material_section.find("pass Splatting") + 1)]
+            # Collect the texture of each texture_unit, grouped by pass
+            log.debug("\nExtracting texture information:")
+            pass_units = {}
+            units = None
+            for token in MATERIAL_TOKEN_RE.finditer(material_section):
+                kind = token.lastgroup
+                if kind == 'pass':
+                    units = pass_units.setdefault(token.group('pass'), [])
+                elif kind == 'unit' and units is not None:
+                    units.append(None)
+                elif kind == 'texture' and units and units[-1] is None:
+                    units[-1] = token.group('texture')
+            lighting_units = pass_units.get('Lighting', [])
+            splatting_units = pass_units.get('Splatting', [])
             
-            # Extract RGB blendmaps
-            print("\nProcessing blendmaps:")
-            texture_units = lighting_pass.split('texture_unit')
-            for unit in texture_units[1:4]:
-                if '_RGB' in unit:
-                    tex = extract_texture_name(unit)
-                    if tex:
-                        print(f"  Found blendmap: {tex}")
-                        textures['blendmaps'].append(tex)
+            # Extract RGB blendmaps from the first three Lighting units
+            log.debug("\nProcessing blendmaps:")
+            for tex in lighting_units[:3]:
+                if tex and '_RGB' in tex:
+                    log.debug("  Found blendmap: %s", tex)
+                    textures['blendmaps'].append(tex)
                     
             # Get normal maps and diffuse textures
-            print("\nProcessing texture layers:")
-            normal_maps = []
-            for unit in texture_units[4:]:
-                if '_NRM' in unit:
-                    tex = extract_texture_name(unit)
-                    if tex:
-                        normal_maps.append(tex)
-
-            diffuse_maps = []
-            splatting_units = splatting_pass.split('texture_unit')
-            for unit in splatting_units[4:]:
-                if 'texture' in unit and not '_RGB' in unit:
-                    tex = extract_texture_name(unit)
-                    if tex and not tex.endswith(('_NRM.dds', '_lightmap.dds')):
-                        diffuse_maps.append(tex)
-
-            # Create texture layers
-            for i in range(len(normal_maps)):
-                if i < len(diffuse_maps):
-                    print(f"  Layer {i+1}: {diffuse_maps[i]} + {normal_maps[i]}")
-                    textures['layers'].append((diffuse_maps[i], normal_maps[i]))
-
-        print(f"\nFound {len(textures['layers'])} texture layers total")
+            log.debug("\nProcessing texture layers:")
+            normal_maps = [tex for tex in lighting_units[3:] if tex and '_NRM' in tex]
+            diffuse_maps = [tex for tex in splatting_units[3:]
+                            if tex and '_RGB' not in tex and not tex.endswith(('_NRM.dds', '_lightmap.dds'))]
+
+            # Create texture layers from the diffuse and normal maps that pair up
+            layer_count = min(len(diffuse_maps), len(normal_maps))
+            textures['diffuse'] = diffuse_maps[:layer_count]
+            textures['normal'] = normal_maps[:layer_count]
+            for i in range(layer_count):
+                log.debug("  Layer %s: %s + %s", i + 1, diffuse_maps[i], normal_maps[i])
+
+        log.debug("\nFound %s texture layers total", len(textures['diffuse']))
         return textures
         
     except Exception as e:
-        print(f"Error parsing material file: {e}")
+        log.error("Error parsing material file: %s", e)
         return None
 
 def parse_alphasplat_material(material_section):
     """Parse an AlphaSplatTerrain material definition"""
     textures = {
         'blendmaps': [],
-        'layers': []
+        'diffuse': [],
+        'normal': []
     }
     
-    # Extract alpha masks
-    fp_section = material_section[material_section.find("fragment_program_ref AlphaSplatTerrain/FP"):] 
-    fp_end = fp_section.find("}")
-    fp_section = fp_section[:fp_end]
-    
-    alpha0_mask = [1,1,1,0]  # Default mask
-    alpha1_mask = [1,1,1,0]
-    
-    if "alpha0Mask" in fp_section:
-        alpha0_line = fp_section[fp_section.find("alpha0Mask"):].split('\n')[0]
-        alpha0_mask = [float(x) for x in alpha0_line.split("float4")[1].strip().split()]
-    if "alpha1Mask" in fp_section:
-        alpha1_line = fp_section[fp_section.find("alpha1Mask"):].split('\n')[0]
-        alpha1_mask = [float(x) for x in alpha1_line.split("float4")[1].strip().split()]
-
-    # Get blend maps
-    for i, line in enumerate(material_section.split('\n')):
-        if 'set_texture_alias AlphaMap' in line:
-            tex = line.split()[2].strip()
+    # Extract alpha masks, blend maps and splat textures in one pass
+    alpha_masks = {}
+    splat_aliases = {}
+    for alias, tex, mask_index, mask in ALPHASPLAT_TOKEN_RE.findall(material_section):
+        if mask_index:
+            alpha_masks.setdefault(mask_index, [float(x) for x in mask.split()])
+        elif alias.startswith('AlphaMap'):
             textures['blendmaps'].append(tex)
+        else:
+            splat_aliases.setdefault(alias, tex)
+    
+    alpha0_mask = alpha_masks.get('0', DEFAULT_ALPHA_MASK)
+    alpha1_mask = alpha_masks.get('1', DEFAULT_ALPHA_MASK)
 
     # Get splat textures and pair with blank normal maps
     splat_count = 8
-    splats = []
-    for i in range(1, splat_count + 1):
-        for line in material_section.split('\n'):
-            if f'set_texture_alias Splat{i}' in line:
-                tex = line.split()[2].strip()
-                splats.append(tex)
-                break
-
-    # Create texture layers based on enabled alpha channels
-    for i, (splat, enabled) in enumerate(zip(splats[:4], alpha0_mask)):
-        if enabled == 1:
-            blend_map = textures['blendmaps'][0]
-            rgb_channel = ['R', 'G', 'B', 'A'][i]
-            textures['layers'].append((splat, 'blank_NRM.dds'))
-            
-    for i, (splat, enabled) in enumerate(zip(splats[4:], alpha1_mask)):
-        if enabled == 1:
-            blend_map = textures['blendmaps'][1]
-            rgb_channel = ['R', 'G', 'B', 'A'][i]
-            textures['layers'].append((splat, 'blank_NRM.dds'))
+    splats = [splat_aliases[f'Splat{i}'] for i in range(1, splat_count + 1) if f'Splat{i}' in splat_aliases]
+
+    # Create texture layers based on enabled alpha channels, the first alpha map covers the first
+    # four splats and the second one the next four
+    for first_splat, alpha_mask in ((0, alpha0_mask), (4, alpha1_mask)):
+        for splat, enabled in zip(splats[first_splat:first_splat + 4], alpha_mask):
+            if enabled == 1:
+                textures['diffuse'].append(splat)
+                textures['normal'].append('blank_NRM.dds')
 
     return textures
 
+@lru_cache(maxsize=1)
 def get_gimp_path():
     """Find GIMP console executable in common installation locations."""
+    # Cached, so the install locations are only probed once per process
     appdata_local = os.getenv('LOCALAPPDATA', '')
     
     possible_paths = [
@@ -229,96 +398,93 @@ def get_gimp_path():
 
 def process_texture_with_gimp(input_texture, output_texture):
     """Process a texture using GIMP to add a black alpha mask and save as DDS with DXT5 compression."""
-    # Check if output texture already exists
-    if os.path.exists(output_texture):
-        print(f"Using existing converted texture: {output_texture}")
-        return True
-        
-    print(f"Converting texture to DDS with alpha mask: {input_texture}")
-    try:
-        # Escape file paths for GIMP
-        input_texture = input_texture.replace("\\", "/")
-        output_texture = output_texture.replace("\\", "/")
-        
-        # Get GIMP console path
-        gimp_console_path = get_gimp_path()
-        
-        # GIMP batch script with correct argument types
-        gimp_script = f"""
-        (let* ((image (car (gimp-file-load RUN-NONINTERACTIVE "{input_texture}" "{input_texture}")))
-               (drawable (car (gimp-image-get-active-layer image))))
-          (gimp-layer-add-alpha drawable)
-          (gimp-edit-fill drawable TRANSPARENT-FILL)
-          (file-dds-save 
-            RUN-NONINTERACTIVE  ; [1] run-mode
-            image              ; [2] image
-            drawable           ; [3] drawable
-            "{output_texture}" ; [4] filename
-            "{output_texture}" ; [5] raw-filename
-            0                  ; [6] format (auto)
-            1                  ; [7] mipmaps
-            0                  ; [8] save-type
-            0                  ; [9] compression
-            5                  ; [10] format-version (5 = DXT5)
-            0                  ; [11] transparent-index
-            0                  ; [12] coverage
-            0                  ; [13] use-perceptual-metric
-            0                  ; [14] alpha-test-threshold
-            0                  ; [15] color-metric-given
-            0                  ; [16] color-metric
-            0                  ; [17] alpha-dither
-            0)                ; [18] dither
-          (gimp-image-delete image))
-        """
-        
-        # Run GIMP in console mode
-        result = subprocess.run(
-            [gimp_console_path, "-i", "-b", gimp_script, "-b", "(gimp-quit 0)"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-       # print(f"GIMP stderr: {result.stderr}")
-       # print(f"GIMP output: {result.stdout}")
-        print(f"Converted texture: {output_texture}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting texture with GIMP: {e}")
-        print(f"GIMP stderr: {e.stderr}")
+    return run_texture_jobs([('dds', input_texture, output_texture)], 1)
 
 def convert_dds_to_png(input_texture, output_texture):
     """Convert DDS texture to PNG using GIMP"""
-    if os.path.exists(output_texture):
-        print(f"Using existing converted texture: {output_texture}")
-        return True
-        
-    print(f"Converting texture to PNG for use in page file: {input_texture}")
+    return run_texture_jobs([('png', input_texture, output_texture)], 1)
+
+def convert_textures_with_gimp(texture_jobs):
+    """Convert (format, input texture, output texture) jobs with a single GIMP console run"""
+    # Every -b command runs in a fresh Script-Fu interpreter, so the procedures, the call for each texture
+    # and the quit all go in one script. catch keeps a texture that fails to convert from stopping the others
+    script = list(GIMP_PROCEDURES)
+    for texture_format, input_texture, output_texture in texture_jobs:
+        # Escape file paths for GIMP, they are Script-Fu string literals
+        input_texture, output_texture = (path.replace("\\", "/").replace('"', '\\"')
+                                         for path in (input_texture, output_texture))
+        script.append('(catch #f (%s "%s" "%s"))' % (GIMP_JOBS[texture_format][0], input_texture, output_texture))
+    script.append("(gimp-quit 0)")
+    
     try:
-        input_texture = input_texture.replace("\\", "/")
-        output_texture = output_texture.replace("\\", "/")
-        gimp_console_path = get_gimp_path()
+        # GIMP's console output is discarded, only stderr is kept for the error report
+        result = subprocess.run([get_gimp_path(), "-i", "-b", " ".join(script)],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True, errors='replace', check=True)
+    except subprocess.CalledProcessError as e:
+        log.error("Error converting textures with GIMP: %s", e)
+        log.error("GIMP stderr: %s", e.stderr)
+        return False
         
-        gimp_script = f"""
-        (let* ((image (car (gimp-file-load RUN-NONINTERACTIVE "{input_texture}" "{input_texture}")))
-               (drawable (car (gimp-image-get-active-layer image))))
-          (file-png-save-defaults RUN-NONINTERACTIVE image drawable "{output_texture}" "{output_texture}")
-          (gimp-image-delete image))
-        """
+    # GIMP exits successfully even when a conversion failed, so check for the output files
+    converted = True
+    for texture_format, input_texture, output_texture in texture_jobs:
+        if os.path.exists(output_texture):
+            log.info(GIMP_JOBS[texture_format][2], output_texture)
+        else:
+            log.error("GIMP failed to convert texture: %s", input_texture)
+            converted = False
+    if not converted:
+        log.error("GIMP stderr: %s", result.stderr)
+    return converted
+
+def convert_to_png_with_pillow(input_texture, output_texture):
+    """Convert a texture to PNG in-process with Pillow, returns False if Pillow is missing or can't read it"""
+    if Image is None:
+        return False
+    try:
+        with Image.open(input_texture) as image:
+            image.save(output_texture, 'PNG')
+    except Exception as e:
+        log.debug("Pillow could not convert %s, using GIMP: %s", input_texture, e)
+        # Don't leave a partial PNG behind, it would be reused as an existing converted texture
+        if os.path.exists(output_texture):
+            os.remove(output_texture)
+        return False
+    log.info(GIMP_JOBS['png'][2], output_texture)
+    return True
+
+def run_texture_jobs(texture_jobs, jobs=None, listings=None):
+    """Run (format, input texture, output texture) jobs, split over up to jobs GIMP processes"""
+    # The same texture can be used by several layers or reached through different paths,
+    # only convert each output file once
+    unique_jobs = {}
+    for job in texture_jobs:
+        unique_jobs.setdefault(os.path.normcase(os.path.realpath(job[2])), job)
         
-        result = subprocess.run(
-            [gimp_console_path, "-i", "-b", gimp_script, "-b", "(gimp-quit 0)"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print(f"Converted texture to PNG: {output_texture}")
+    pending = []
+    for job in unique_jobs.values():
+        texture_format, input_texture, output_texture = job
+        if file_exists(output_texture, listings):
+            log.info("Using existing converted texture: %s", output_texture)
+            continue
+        log.info(GIMP_JOBS[texture_format][1], input_texture)
+        # DXT5 with mipmaps needs GIMP, but Pillow can write PNGs and saves a GIMP start
+        if not (texture_format == 'png' and convert_to_png_with_pillow(input_texture, output_texture)):
+            pending.append(job)
+    if not pending:
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"Error converting texture to PNG: {e}")
-        print(f"GIMP stderr: {e.stderr}")
-        return False
+        
+    workers = min(jobs or os.cpu_count() or 1, len(pending))
+    if workers == 1:
+        return convert_textures_with_gimp(pending)
+        
+    # GIMP does the work in its own processes, so threads only have to wait on them
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return all(executor.map(convert_textures_with_gimp, [pending[i::workers] for i in range(workers)]))
 
-def copy_default_textures(output_dir):
-    """Copy default terrain textures from textures folder to output directory"""
+def copy_default_textures(output_dir, listings=None):
+    """Link or copy default terrain textures from textures folder to output directory"""
     default_tex_dir = os.path.join(os.path.dirname(__file__), "textures")
     default_textures = [
         "blank_NRM.dds",
@@ -330,220 +496,247 @@ def copy_default_textures(output_dir):
     for texture in default_textures:
         src = os.path.join(default_tex_dir, texture)
         dst = os.path.join(output_dir, texture)
-        if os.path.exists(src) and not os.path.exists(dst):
-            import shutil
-            shutil.copy2(src, dst)
-            print(f"Copied default texture: {texture}")
+        if os.path.exists(src) and not file_exists(dst, listings):
+            try:
+                # Hard link the texture when both folders are on the same file system instead of copying it
+                os.link(src, dst)
+            except FileExistsError:
+                # Already there, e.g. linked by another terrain in the same folder
+                continue
+            except OSError as e:
+                if e.errno not in LINK_UNSUPPORTED_ERRNOS:
+                    raise
+                shutil.copy2(src, dst)
+                log.info("Copied default texture: %s", texture)
+            else:
+                log.info("Linked default texture: %s", texture)
 
-def convert_cfg_to_otc(cfg_file, output_name=None):
-    """Convert .cfg to .otc format"""
+def convert_cfg_to_otc(cfg_file, output_name=None, jobs=None):
+    """Convert .cfg to .otc format, returns False without output if the .cfg does not exist"""
     try:
-        print(f"Converting {cfg_file} to otc format...")
+        # Read values from .cfg (plain key=value lines without sections, so not an INI file).
+        # Keys stay bytes and only the values of known keys get decoded
+        settings = {'heightmap_flip': False, 'max_pixel_error': '0'}
+        try:
+            with open_buffer(cfg_file) as content:
+                for setting in CFG_SETTING_RE.finditer(content):
+                    handler = CFG_HANDLERS.get(setting.group(1).strip())
+                    if handler:
+                        name, convert = handler
+                        settings[name] = convert(setting.group(2).strip())
+        except FileNotFoundError:
+            return False
+            
+        log.info("Converting %s to otc format...", cfg_file)
         
         # Use custom output name if provided, otherwise use input name
-        if output_name:
-            terrain_name = output_name
-            otc_path = os.path.join(os.path.dirname(cfg_file), f'{output_name}.otc')
-        else:
-            terrain_name = os.path.splitext(os.path.basename(cfg_file))[0]
-            otc_path = os.path.splitext(cfg_file)[0] + '.otc'
+        terrain_name = output_name or os.path.splitext(os.path.basename(cfg_file))[0]
+        # Every generated file and texture lives next to the cfg
+        cfg_dir = os.path.dirname(cfg_file)
+        otc_path = os.path.join(cfg_dir, f'{terrain_name}.otc')
+        page_path = os.path.join(cfg_dir, f'{terrain_name}-page-0-0.otc')
         
-        # Read values from .cfg
-        heightmap_size = None
-        heightmap_bpp = None
-        heightmap_flip = False
-        world_size_x = None
-        world_size_z = None
-        max_height = None
-        max_pixel_error = "0"
-        heightmap_image = None
-        world_texture = None
-        custom_material = None
-        
-        with open(cfg_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('#') or not line:
-                    continue
-                    
-                if 'Heightmap.image=' in line:
-                    heightmap_image = line.split('=')[1]
-                elif 'WorldTexture=' in line:
-                    world_texture = line.split('=')[1]
-                elif 'Heightmap.raw.size=' in line:
-                    heightmap_size = line.split('=')[1]
-                elif 'Heightmap.raw.bpp=' in line:
-                    heightmap_bpp = line.split('=')[1]
-                elif 'Heightmap.flip=' in line and line.split('=')[1].lower() == 'true':
-                    heightmap_flip = True
-                elif 'PageWorldX=' in line:
-                    world_size_x = line.split('=')[1]
-                elif 'PageWorldZ=' in line:
-                    world_size_z = line.split('=')[1]
-                elif 'MaxHeight=' in line:
-                    max_height = line.split('=')[1]
-                elif 'MaxPixelError=' in line:
-                    max_pixel_error = line.split('=')[1]
-                elif 'CustomMaterialName=' in line:
-                    custom_material = line.split('=')[1].strip()
+        heightmap_size = settings.get('heightmap_size')
+        heightmap_bpp = settings.get('heightmap_bpp')
+        heightmap_flip = settings['heightmap_flip']
+        world_size_x = settings.get('world_size_x')
+        world_size_z = settings.get('world_size_z')
+        max_height = settings.get('max_height')
+        max_pixel_error = settings['max_pixel_error']
+        heightmap_image = settings.get('heightmap_image')
+        world_texture = settings.get('world_texture')
+        custom_material = settings.get('custom_material') or None
         
         if not all([heightmap_size, heightmap_bpp, world_size_x, world_size_z, max_height]):
-            print("Error: Missing required values in cfg file")
+            log.error("Error: Missing required values in cfg file")
             return False
             
         # Create main .otc file
-        with open(otc_path, 'w') as f:
-            f.write(f'Heightmap.0.0.raw.size={heightmap_size}\n')
-            f.write(f'Heightmap.0.0.raw.bpp={heightmap_bpp}\n')
-            f.write(f'Heightmap.0.0.flipX={1 if heightmap_flip else 0}\n')
-            f.write('\n')
-            f.write(f'WorldSizeX={world_size_x}\n')
-            f.write(f'WorldSizeZ={world_size_z}\n')
-            f.write(f'WorldSizeY={max_height}\n')
-            f.write('\n')
-            f.write('disableCaching=1\n')
-            f.write('\n')
-            f.write(f'PageFileFormat={terrain_name}-page-0-0.otc\n')
-            f.write('\n')
-            f.write(f'MaxPixelError={max_pixel_error}\n')
-            f.write('LightmapEnabled=0\n')
-            f.write('SpecularMappingEnabled=1\n')
-            f.write('NormalMappingEnabled=1\n')
-        print(f"Created {otc_path}")
+        write_file(otc_path, OTC_TEMPLATE % {
+            'heightmap_size': heightmap_size,
+            'heightmap_bpp': heightmap_bpp,
+            'flip_x': 1 if heightmap_flip else 0,
+            'world_size_x': world_size_x,
+            'world_size_z': world_size_z,
+            'world_size_y': max_height,
+            'terrain_name': terrain_name,
+            'max_pixel_error': max_pixel_error
+        })
+        log.info("Created %s", otc_path)
             
-        # Create page files
+        # Create page files. One listing of the terrain directory serves the material search
+        # and the checks for already converted or copied textures
+        with os.scandir(cfg_dir or '.') as entries:
+            dir_entries = list(entries)
+        listings = {os.path.normcase(cfg_dir): {os.path.normcase(entry.name) for entry in dir_entries}}
+        
         if custom_material:
-            print(f"\nFound custom material name: {custom_material}")
-            material_dir = os.path.dirname(cfg_file)
-            material_files = [f for f in os.listdir(material_dir) if f.endswith('.material')]
-            
-            material_textures = None
-            for mat_file in material_files:
-                material_textures = parse_etterrain_material(os.path.join(material_dir, mat_file), custom_material)
-                if material_textures:
-                    break
+            log.info("\nFound custom material name: %s", custom_material)
+            # DirEntry caches the file type from the directory listing, so no extra stat per entry.
+            # The search stops at the first material file that defines the material
+            material_textures = next((textures for entry in dir_entries
+                                      if entry.name.endswith('.material') and entry.is_file() and
+                                      (textures := parse_etterrain_material(entry.path, custom_material))),
+                                     None)
                     
             if material_textures:
                 # Show warning if more than 5 texture layers
-                if len(material_textures['layers']) > 5:
-                    print(f"\n{YELLOW}WARNING: This terrain features more than 5 texture layers. "
-                          f"Texture layers WILL BE MISSING as RoR only supports 5 layers (6 without shadows)!{ENDC}")
+                if len(material_textures['diffuse']) > 5:
+                    log.warning("\n%sWARNING: This terrain features more than 5 texture layers. "
+                                "Texture layers WILL BE MISSING as RoR only supports 5 layers (6 without shadows)!%s",
+                                YELLOW, ENDC)
                 
                 # Process diffuse textures through GIMP
+                texture_jobs = []
                 processed_diffuse_textures = []
-                for diffuse, _ in material_textures['layers']:
-                    input_texture = os.path.join(os.path.dirname(cfg_file), diffuse)
-                    output_texture = os.path.splitext(input_texture)[0] + "_diffusespecular.dds"
-                    process_texture_with_gimp(input_texture, output_texture)
+                for diffuse in material_textures['diffuse']:
+                    processed_texture = os.path.splitext(diffuse)[0] + "_diffusespecular.dds"
+                    texture_jobs.append(('dds', os.path.join(cfg_dir, diffuse), os.path.join(cfg_dir, processed_texture)))
                     # Store only the filename, not the full path
-                    processed_diffuse_textures.append(os.path.basename(output_texture))
+                    processed_diffuse_textures.append(os.path.basename(processed_texture))
+                run_texture_jobs(texture_jobs, jobs, listings)
 
                 # Ensure blank_NRM.dds is available
-                copy_default_textures(os.path.dirname(cfg_file))
+                copy_default_textures(cfg_dir, listings)
 
                 # Create page file with processed textures
-                page_path = os.path.join(os.path.dirname(cfg_file), f'{terrain_name}-page-0-0.otc')
-                with open(page_path, 'w') as f:
-                    f.write(f'{heightmap_image}\n')
-                    f.write(f'{len(material_textures["layers"])}\n')
-                    f.write('; worldSize, diffusespecular, normalheight, blendmap, blendmapmode, alpha\n')
+                page = []
+                page.append(f'{heightmap_image}\n')
+                page.append(f'{len(material_textures["diffuse"])}\n')
+                page.append('; worldSize, diffusespecular, normalheight, blendmap, blendmapmode, alpha\n')
                     
-                    for i, (diffuse, normal) in enumerate(material_textures['layers']):
-                        blend_idx = i // 3
-                        rgb_channel = ['R', 'G', 'B'][i % 3]
-                        if blend_idx < len(material_textures['blendmaps']):
-                            blendmap = material_textures['blendmaps'][blend_idx]
-                            f.write(f'6, {processed_diffuse_textures[i]}, {normal}, {blendmap}, {rgb_channel}, 1.0\n')
+                # Each blendmap covers three layers through its R, G and B channels,
+                # layers beyond the available blendmaps are left out
+                blendmaps = [blendmap for blendmap in material_textures['blendmaps'] for _ in range(3)]
+                channels = RGBA_CHANNELS[:3] * len(material_textures['blendmaps'])
+                page.extend(f'6, {diffuse}, {normal}, {blendmap}, {rgb_channel}, 1.0\n'
+                            for diffuse, normal, blendmap, rgb_channel in
+                            zip(processed_diffuse_textures, material_textures['normal'], blendmaps, channels))
+                write_file(page_path, ''.join(page))
                 
-                print(f"Created {page_path}")
+                log.info("Created %s", page_path)
                 return True
         else:
             # Process the base diffuse texture for simple terrain
             if world_texture:
-                base_name, ext = os.path.splitext(world_texture)
-                input_texture = os.path.join(os.path.dirname(cfg_file), world_texture)
+                base_name = os.path.splitext(world_texture)[0]
+                input_texture = os.path.join(cfg_dir, world_texture)
                 base_texture = f"{base_name}_diffusespecular.dds"  # Just the filename
-                base_texture_path = os.path.join(os.path.dirname(cfg_file), base_texture)
-                process_texture_with_gimp(input_texture, base_texture_path)
+                base_texture_path = os.path.join(cfg_dir, base_texture)
                 
                 # Convert base texture to PNG for detail layer
                 detail_texture = f"{base_name}.png"
-                detail_texture_path = os.path.join(os.path.dirname(cfg_file), detail_texture)
-                convert_dds_to_png(input_texture, detail_texture_path)
+                detail_texture_path = os.path.join(cfg_dir, detail_texture)
+                run_texture_jobs([('dds', input_texture, base_texture_path),
+                                  ('png', input_texture, detail_texture_path)], jobs, listings)
             else:
                 base_texture = f'{terrain_name}_DS.dds'
                 detail_texture = f'{terrain_name}.png'
 
             # Copy default textures before creating the page file
-            copy_default_textures(os.path.dirname(cfg_file))
+            copy_default_textures(cfg_dir, listings)
 
             # Create page-0-0.otc file for simple terrain
-            page_path = os.path.join(os.path.dirname(cfg_file), f'{terrain_name}-page-0-0.otc')
-            with open(page_path, 'w') as f:
-                f.write(f'{heightmap_image}\n')
+            page = []
+            page.append(f'{heightmap_image}\n')
                 
-                # Write number of texture layers
-                f.write('2\n')
+            # Write number of texture layers
+            page.append('2\n')
                 
-                # Write base layer
-                f.write(f'; worldSize, diffusespecular, normalheight, blendmap, blendmapmode, alpha\n')
-                f.write(f'{world_size_x}, {base_texture}, blank_NRM.dds\n')
+            # Write base layer
+            page.append(f'; worldSize, diffusespecular, normalheight, blendmap, blendmapmode, alpha\n')
+            page.append(f'{world_size_x}, {base_texture}, blank_NRM.dds\n')
                 
-                # Write detail layer with converted texture
-                f.write('10, terrain_detail_dark_ds.dds, terrain_detail_nrm.dds, ' + detail_texture + ', R, 0.5\n')
+            # Write detail layer with converted texture
+            page.append('10, terrain_detail_dark_ds.dds, terrain_detail_nrm.dds, ' + detail_texture + ', R, 0.5\n')
+            write_file(page_path, ''.join(page))
 
-            print(f"Created {page_path}")
+            log.info("Created %s", page_path)
             return True
         
     except Exception as e:
-        print(f"Error converting cfg file: {e}")
+        log.error("Error converting cfg file: %s", e)
         return False
 
-def convert_terrn_to_terrn2(input_file, output_name=None, display_name=None):
+def convert_terrn_to_terrn2(input_file, output_name=None, display_name=None, jobs=None):
     """Convert .terrn to .terrn2 format"""
     try:
-        print(f"Converting {input_file} to terrn2 format...")
+        log.info("Converting %s to terrn2 format...", input_file)
         
-        # Use custom output name if provided
-        if output_name:
-            output_path = os.path.join(os.path.dirname(input_file), f'{output_name}.terrn2')
-            tobj_name = f"{output_name}.tobj"
-            cfg_name = f"{output_name}.otc"
-        else:
-            output_path = os.path.splitext(input_file)[0] + '.terrn2'
-            output_name = os.path.splitext(os.path.basename(input_file))[0]
-            tobj_name = os.path.splitext(os.path.basename(input_file))[0] + ".tobj"
-            cfg_name = os.path.splitext(os.path.basename(input_file))[0] + ".otc"
+        # Use custom output name if provided, otherwise use input name
+        output_dir, input_name = os.path.split(input_file)
+        if not output_name:
+            output_name = os.path.splitext(input_name)[0]
+        output_path = os.path.join(output_dir, f'{output_name}.terrn2')
+        tobj_name = f"{output_name}.tobj"
+        tobj_path = os.path.join(output_dir, tobj_name)
+        cfg_name = f"{output_name}.otc"
 
         terrain_name = ""
         ogre_cfg = ""
         water_height = None
         water_color = ""
         start_position = ""
-        objects = []
+        tobj_buf = bytearray()  # Lines copied as-is to the .tobj file
+        object_lines = []  # (index, line, stripped line, lowercase line) waiting for the .tobj
+        found_first_object = False
         authors = {}
         gravity = "-9.81"
         landuse_cfg = None
         has_caelum = False
         sandstorm_cubemap = "tracks/skyboxcol"  # Default value
         
-        with open(input_file, 'r') as f:
-            lines = f.readlines()
+        # Lines stay bytes; only the header values written to the terrn2 file are decoded
+        newline = os.linesep.encode()
+        with open(input_file, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            lines = f.read().splitlines()
             
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith("//end"):
+            def collect_object_lines():
+                """Copy the held back lines to the .tobj, except header and metadata lines"""
+                nonlocal found_first_object, tobj_buf
+                first_object_line = 5 if water_height else 4
+                for i, obj, line, line_lower in object_lines:
+                    if i < first_object_line or is_metadata_comment(line):
+                        continue
+                        
+                    # Skip the start position coordinates (9 values) before the first object
+                    is_start_position = not found_first_object and line.count(b',') == 8
+                    if b',' in line and not is_start_position:
+                        found_first_object = True
+                    
+                    # Skip caelumconfig, landuse-config and sandstormcubemap lines
+                    if not (is_start_position or
+                            line.startswith((b'caelumconfig', b'landuse-config')) or
+                            line_lower.startswith(b'sandstormcubemap')):
+                        # Copy everything else as-is, except 'end' keyword
+                        if line_lower != b'end':
+                            tobj_buf += obj
+                        tobj_buf += newline
+                object_lines.clear()
+                
+            for i, obj in enumerate(lines):
+                line = obj.strip()
+                if not line:
+                    continue
+                line_lower = line.lower()
+                
+                # Beginning lines (terrain info) are skipped from the .tobj: 5 with water, 4 without.
+                # Whether there is a water line is only known once the header has been parsed, so lines
+                # from the fifth on are held back until the start position (the last header line) is read
+                if i >= 4:
+                    object_lines.append((i, obj, line, line_lower))
+                if start_position:
+                    collect_object_lines()
+                
+                if line.startswith(b"//end"):
                     continue
                     
                 # Extract authors from comments
-                if (line.lower().startswith("//author") or 
-                    line.lower().startswith(";author")):
-                    parts = line[2:] if line.startswith("//") else line[1:]
-                    parts = parts.split(" ")
-                    if len(parts) >= 3:
-                        # Combine "author" and type (e.g., "author terrain" -> "terrain")
-                        author_type = parts[1]  # get terrain, texture, etc.
-                        author_name = " ".join(parts[3:])  # Skip "author", type, and ID to get name
+                author = AUTHOR_RE.match(line)
+                if author:
+                    if author.group('type') is not None:
+                        author_type = decode_text(author.group('type'))  # get terrain, texture, etc.
+                        author_name = decode_text(author.group('name') or b"")  # Skip type and ID to get name
                         
                         # Remove email if present
                         if '@' in author_name:
@@ -553,149 +746,132 @@ def convert_terrn_to_terrn2(input_file, output_name=None, display_name=None):
                     continue
                     
                 # Extract gravity value
-                if line.startswith("gravity "):
-                    gravity = line.split(" ")[1]
+                if line.startswith(b"gravity "):
+                    gravity = decode_text(line.partition(b" ")[2].partition(b" ")[0])
                     continue
                     
                 # Extract landuse config
-                if line.startswith("landuse-config "):
-                    landuse_cfg = line.split(" ")[1]
+                if line.startswith(b"landuse-config "):
+                    landuse_cfg = decode_text(line.partition(b" ")[2].partition(b" ")[0])
                     continue
                     
                 # Check for sandstorm cubemap
-                if line.lower().startswith("sandstormcubemap "):
-                    sandstorm_cubemap = line.split(" ", 1)[1]
+                if line_lower.startswith(b"sandstormcubemap "):
+                    sandstorm_cubemap = decode_text(line.partition(b" ")[2])
                     continue
                     
                 # Check for caelum config
-                if line.startswith("caelumconfig"):
+                if line.startswith(b"caelumconfig"):
                     has_caelum = True
                     continue
                     
                 # First 5 lines are header info
                 if not terrain_name:
-                    terrain_name = line
+                    terrain_name = decode_text(line)
                 elif not ogre_cfg:
-                    ogre_cfg = line
-                elif line == "caelum":  # Skip the caelum keyword if it's the third line
+                    ogre_cfg = decode_text(line)
+                elif line == b"caelum":  # Skip the caelum keyword if it's the third line
                     continue
-                elif line.startswith("w "):
-                    water_height = line.split(" ")[1]
+                elif line.startswith(b"w "):
+                    water_height = decode_text(line.partition(b" ")[2].partition(b" ")[0])
                 elif not water_color:
-                    water_color = line
+                    water_color = decode_text(line)
                 elif not start_position:
-                    start_position = line.split(",")[0:3]  # Only take first 3 coordinates
-                # Rest are objects
-                elif not line.startswith("//"):
-                    objects.append(line)
-
-        output_dir = os.path.dirname(input_file)
-        tobj_path = os.path.join(output_dir, tobj_name)
+                    start_position = decode_text(line).split(",", 3)[:3]  # Only take first 3 coordinates
+                    
+            # Lines are still held back if the header never got to the start position
+            collect_object_lines()
 
         try:
             # Create terrn2 file first
-            with open(output_path, 'w') as f:
-                f.write('[General]\n')
+            if water_height:
+                water_block = f'Water=1\nWaterLine = {water_height}\n'
+            else:
+                water_block = 'Water=0\n'
+            if has_caelum:
+                caelum_line = f'CaelumConfigFile = {input_name}.os\n'
+            else:
+                caelum_line = '#CaelumConfigFile =\n'
+            authors_block = ''.join(f'{author_type} = {author_name}\n'
+                                    for author_type, author_name in authors.items()) or 'terrain = unknown\n'
+            
+            # Check for angelscript file
+            scripts_block = f'{input_name}.as=\n' if os.path.exists(input_file + '.as') else ''
+            
+            terrn2 = TERRN2_TEMPLATE % {
                 # Use custom display name if provided, otherwise use terrain name from file
-                f.write(f'Name = {display_name if display_name else terrain_name}\n')
-                f.write(f'GeometryConfig = {cfg_name}\n')
-                if water_height:
-                    f.write('Water=1\n')
-                    f.write(f'WaterLine = {water_height}\n')
-                else:
-                    f.write('Water=0\n')
-                f.write(f'AmbientColor = {water_color}\n')
-                f.write(f'StartPosition = {", ".join(start_position)}\n')
-                if has_caelum:
-                    f.write(f'CaelumConfigFile = {os.path.basename(input_file)}.os\n')
-                else:
-                    f.write('#CaelumConfigFile =\n')
-                f.write(f'SandStormCubeMap = {sandstorm_cubemap}\n')
-                f.write(f'Gravity = {gravity}\n')
-                f.write('CategoryID = 129\n')
-                f.write('Version = 1\n')
-                f.write(f'GUID = {str(uuid.uuid4())}\n')
-                if landuse_cfg:
-                    f.write(f'TractionMap = {landuse_cfg}\n')
-                f.write('\n\n')
-                
-                f.write('[Authors]\n')
-                for author_type, author_name in authors.items():
-                    f.write(f'{author_type} = {author_name}\n')
-                if not authors:
-                    f.write('terrain = unknown\n')
-                f.write(f'terrn2 = CM_terrn_converter\n\n')
-                
-                f.write(' \n[Objects]\n')
-                f.write(f'{tobj_name}=\n\n')
-                
-                # Check for angelscript file
-                f.write('[Scripts]\n')
-                as_script = input_file + '.as'
-                if os.path.exists(as_script):
-                    script_name = os.path.basename(as_script)
-                    f.write(f'{script_name}=\n')
-
-            print(f"Created {output_path}")
+                'name': display_name if display_name else terrain_name,
+                'geometry_config': cfg_name,
+                'water': water_block,
+                'ambient_color': water_color,
+                'start_position': ", ".join(start_position),
+                'caelum': caelum_line,
+                'sandstorm_cubemap': sandstorm_cubemap,
+                'gravity': gravity,
+                'guid': generate_guid(),
+                'traction_map': f'TractionMap = {landuse_cfg}\n' if landuse_cfg else '',
+                'authors': authors_block,
+                'tobj_name': tobj_name,
+                'scripts': scripts_block
+            }
+
+            write_file(output_path, terrn2)
+
+            log.info("Created %s", output_path)
 
             # Create .tobj file second
-            with open(tobj_path, 'w') as f:
-                header_count = 0
-                found_first_object = False
-                required_headers = 5 if water_height else 4  # Skip 4 lines if no water
-                
-                for obj in lines:
-                    # Skip beginning lines (terrain info)
-                    if header_count < required_headers:
-                        header_count += 1
-                        continue
-                        
-                    # Skip empty lines, metadata comments and author comments
-                    if (not obj.strip() or 
-                        '//fileinfo' in obj or ';fileinfo' in obj or 
-                        '//author' in obj.lower() or ';author' in obj.lower() or
-                        ((obj.strip().startswith('//') or obj.strip().startswith(';')) and 
-                         any(c.isdigit() for c in obj.split('=')[0]) and 
-                         '=' in obj)):
-                        continue
-                        
-                    # Skip the start position coordinates 
-                    if not found_first_object and ',' in obj:
-                        coords = obj.split(',')
-                        if len(coords) == 9:  # Start position has 9 coordinates
-                            continue
-                        found_first_object = True
-                    
-                    # Skip caelumconfig and landuse-config lines
-                    line = obj.strip()
-                    if (line.startswith('caelumconfig') or
-                        line.startswith('landuse-config') or
-                        line.lower().startswith('sandstormcubemap')):
-                        continue
-                    
-                    # Write everything else as-is, except 'end' keyword
-                    if line and line.lower() != 'end':
-                        f.write(obj if obj.endswith('\n') else obj + '\n')
-                    else:
-                        f.write('\n')
+            write_file(tobj_path, tobj_buf)
 
-            print(f"Created {tobj_path}")
+            log.info("Created %s", tobj_path)
             
             # Convert cfg file last
-            cfg_path = os.path.join(output_dir, ogre_cfg)
-            if os.path.exists(cfg_path):
-                convert_cfg_to_otc(cfg_path, output_name)
+            convert_cfg_to_otc(os.path.join(output_dir, ogre_cfg), output_name, jobs)
                 
             return True
             
         except IOError as e:
-            print(f"Error creating files: {e}")
+            log.error("Error creating files: %s", e)
             return False
             
     except Exception as e:
-        print(f"Error converting terrain: {e}")
+        log.error("Error converting terrain: %s", e)
         return False
 
+def setup_logging(level=logging.INFO):
+    """Print log messages to stdout as plain lines, material parsing details are only shown at DEBUG level"""
+    logging.basicConfig(format='%(message)s', stream=sys.stdout)
+    # Only this script's messages follow --verbose, libraries such as Pillow stay at WARNING
+    log.setLevel(level)
+
+def convert_in_order(input_files, jobs=None):
+    """Convert .terrn files one after another, returns a list of their results"""
+    return [convert_terrn_to_terrn2(input_file, jobs=jobs) for input_file in input_files]
+
+def convert_many(input_files, jobs=None):
+    """Convert several .terrn files in parallel, returns True if all of them succeeded"""
+    # Terrains in the same folder share their converted and default textures, so they are converted one
+    # after another by the same worker, and only different folders run in parallel. When there are fewer
+    # folders than jobs, the spare jobs convert textures in parallel within each terrain, keeping at most
+    # jobs GIMP processes running in total.
+    # Workers set up logging themselves, as spawned processes don't inherit the configuration
+    groups = {}
+    for input_file in input_files:
+        groups.setdefault(os.path.normcase(os.path.realpath(os.path.dirname(input_file))), []).append(input_file)
+    groups = list(groups.values())
+    
+    jobs = jobs or os.cpu_count() or 1
+    workers = min(jobs, len(groups))
+    with ProcessPoolExecutor(max_workers=workers, initializer=setup_logging,
+                             initargs=(log.getEffectiveLevel(),)) as executor:
+        group_results = list(executor.map(partial(convert_in_order, jobs=max(1, jobs // workers)), groups))
+    results = []
+    for group, group_result in zip(groups, group_results):
+        for input_file, result in zip(group, group_result):
+            if not result:
+                log.error("Failed to convert %s", input_file)
+            results.append(result)
+    return all(results)
+
 if __name__ == "__main__":
     if '-help' in sys.argv:
         sys.argv[sys.argv.index('-help')] = '--help'
@@ -708,18 +884,47 @@ Examples:
   %(prog)s terrain.terrn                         # Basic conversion
   %(prog)s terrain.terrn -f newname              # Convert with specifed file name
   %(prog)s terrain.terrn -d "Display Name"       # Convert with specifed display name shown in terrain selector
+  %(prog)s first.terrn second.terrn              # Convert several terrains in parallel
+  %(prog)s path/to/terrains                      # Convert every .terrn file in a directory
 ''')
-    parser.add_argument('input_file', help='Input .terrn file to convert')
+    parser.add_argument('input_files', nargs='+', metavar='input_file',
+                        help='Input .terrn file(s) or directories containing them to convert')
     parser.add_argument('-f', '--filename', help='Output filename (without extension) for all generated files')
     parser.add_argument('-d', '--displayname', help='Display name shown in terrain selector')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of terrains and textures to convert in parallel (default: CPU count)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show material parsing details')
     
     args = parser.parse_args()
+    setup_logging(logging.DEBUG if args.verbose else logging.INFO)
     
-    if not args.input_file.endswith('.terrn'):
+    if args.jobs is not None and args.jobs < 1:
+        print("Error: --jobs must be at least 1")
+        sys.exit(1)
+    
+    # Directories are expanded to the .terrn files they contain
+    input_files = []
+    for input_path in args.input_files:
+        if os.path.isdir(input_path):
+            input_files.extend(sorted(os.path.join(input_path, f) for f in os.listdir(input_path) if f.endswith('.terrn')))
+        else:
+            input_files.append(input_path)
+            
+    if not input_files:
+        print("Error: No .terrn files found")
+        sys.exit(1)
+        
+    if not all(input_file.endswith('.terrn') for input_file in input_files):
         print("Error: Input file must be a .terrn file")
         sys.exit(1)
         
-    success = convert_terrn_to_terrn2(args.input_file, args.filename, args.displayname)
+    if len(input_files) == 1:
+        success = convert_terrn_to_terrn2(input_files[0], args.filename, args.displayname, args.jobs)
+    elif args.filename or args.displayname:
+        print("Error: --filename and --displayname can only be used with a single input file")
+        sys.exit(1)
+    else:
+        success = convert_many(input_files, args.jobs)
+        
     if success:
         print("Terrain conversion completed successfully!")
     else: